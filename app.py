@@ -8,6 +8,7 @@ from collections import Counter
 from utils.ai_generator import generate_wellbeing_report
 from utils.db_models import SessionData # Ensure this is imported
 from utils.db_models import TodoItem # Add TodoItem
+from utils.shared_state import SharedState
 import os
 # --- NEW IMPORTS FOR CHATBOT ---
 import google.generativeai as genai
@@ -28,6 +29,8 @@ bcrypt = Bcrypt(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+shared_state = SharedState()
+shared_state.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -176,6 +179,8 @@ def monitor():
     # Store session ID in Flask session (cookie) to track data
     from flask import session as flask_session
     flask_session['current_session_id'] = new_session.id
+    # Start fresh running aggregates in shared state
+    shared_state.start_session(new_session.id)
     
     return render_template('monitor.html')
 
@@ -188,9 +193,13 @@ def update_session():
     data = request.json
     session_id = flask_session.get('current_session_id')
     
-    if session_id:
+    if session_id and data:
         current_sess = MonitoringSession.query.get(session_id)
         if current_sess:
+            # Rate-limit bucket in shared state (only valid updates count)
+            if not shared_state.allow_request(f"update_session:{current_user.id}", app.config['UPDATE_RATE_LIMIT'], 60):
+                return {'status': 'rate_limited'}, 429
+
             # 1. Update Summary Metrics
             current_sess.total_blinks = data.get('blinks', 0)
             current_sess.keyboard_activity = data.get('keys', 0)
@@ -201,9 +210,11 @@ def update_session():
             
             # 2. Log Granular Data
             emotion = data.get('emotion', 'Neutral')
+            snapshot_time = datetime.utcnow()
             
             new_data = SessionData(
                 session_id=session_id,
+                timestamp=snapshot_time,
                 blink_count_snapshot=data.get('blinks', 0),
                 detected_emotion=emotion,
                 stress_score=0.0,
@@ -212,6 +223,9 @@ def update_session():
             )
             db.session.add(new_data)
             db.session.commit()
+
+            # 3. Keep running aggregates hot for the report
+            shared_state.record_snapshot(session_id, snapshot_time, data.get('blinks', 0), emotion)
             return {'status': 'success'}, 200
             
     return {'status': 'error'}, 400
@@ -237,14 +251,22 @@ def generate_report():
     duration = round(duration, 2)
 
     # 3. Analyze Data Points (Emotions & Charts)
-    # Fetch all granular data for this session, SORTED BY TIME
-    all_data = SessionData.query.filter_by(session_id=session_id).order_by(SessionData.timestamp).all()
-    
-    emotion_list = [d.detected_emotion for d in all_data if d.detected_emotion]
+    # Use the running aggregates from shared state when they cover every stored snapshot,
+    # otherwise (store reset, down, or another worker's memory) fetch all granular data, SORTED BY TIME
+    aggregates = shared_state.get_aggregates(session_id)
+    if aggregates and len(aggregates[1]) == SessionData.query.filter_by(session_id=session_id).count():
+        emotion_counts, timeline = aggregates
+        emotion_counts = Counter(emotion_counts)
+        timestamps = [t for t, _ in timeline]
+        blinks_over_time = [b for _, b in timeline]
+    else:
+        all_data = SessionData.query.filter_by(session_id=session_id).order_by(SessionData.timestamp).all()
+        emotion_counts = Counter(d.detected_emotion for d in all_data if d.detected_emotion)
+        timestamps = [d.timestamp.strftime('%H:%M:%S') for d in all_data]
+        blinks_over_time = [d.blink_count_snapshot for d in all_data]
     
-    if emotion_list:
+    if emotion_counts:
         # Find most common emotion
-        emotion_counts = Counter(emotion_list)
         dominant_emotion = emotion_counts.most_common(1)[0][0]
         emotion_summary = str(dict(emotion_counts))
     else:
@@ -265,10 +287,7 @@ def generate_report():
     )
 
     # --- NEW: Prepare Data for Charts ---
-    # Extract timestamps (X-axis) and blink counts (Y-axis)
-    timestamps = [d.timestamp.strftime('%H:%M:%S') for d in all_data]
-    blinks_over_time = [d.blink_count_snapshot for d in all_data]
-    
+    # Timestamps (X-axis) and blink counts (Y-axis) were collected in step 3
     chart_data = {
         "timestamps": timestamps,
         "blinks": blinks_over_time
@@ -278,8 +297,11 @@ def generate_report():
     current_sess.gemini_report = ai_text
     db.session.commit()
     
-    # 6. Clear session cookie
+    # 6. Clear session cookie and running aggregates
+    # The session is finished, so its chart data can't change anymore: cache it for view_report
     flask_session.pop('current_session_id', None)
+    shared_state.end_session(session_id)
+    shared_state.cache_set(f"chart:{session_id}", chart_data)
     
     # 7. Return Template with Chart Data
     return render_template('report.html', 
@@ -351,16 +373,20 @@ def view_report(session_id):
     if session.user_id != current_user.id:
         return redirect(url_for('dashboard'))
     
-    # 2. Re-construct Chart Data
-    all_data = SessionData.query.filter_by(session_id=session_id).order_by(SessionData.timestamp).all()
-    
-    timestamps = [d.timestamp.strftime('%H:%M:%S') for d in all_data]
-    blinks_over_time = [d.blink_count_snapshot for d in all_data]
-    
-    chart_data = {
-        "timestamps": timestamps,
-        "blinks": blinks_over_time
-    }
+    # 2. Re-construct Chart Data (finished sessions are cached in shared state)
+    chart_data = shared_state.cache_get(f"chart:{session_id}") if session.end_time else None
+    if chart_data is None:
+        all_data = SessionData.query.filter_by(session_id=session_id).order_by(SessionData.timestamp).all()
+        
+        timestamps = [d.timestamp.strftime('%H:%M:%S') for d in all_data]
+        blinks_over_time = [d.blink_count_snapshot for d in all_data]
+        
+        chart_data = {
+            "timestamps": timestamps,
+            "blinks": blinks_over_time
+        }
+        if session.end_time:
+            shared_state.cache_set(f"chart:{session_id}", chart_data)
     
     # 3. Render the existing report template
     return render_template('report.html', 
@@ -0,0 +1,98 @@
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from utils.shared_state import MemoryStateBackend, SharedState, create_backend
+from utils import shared_state as shared_state_module
+
+# Runs the same SharedState flow against both backends.
+# The Redis side uses fakeredis' TCP server as a local stand-in (pip install fakeredis),
+# or a real server if you pass its URL:  python check_shared_state.py redis://localhost:6379/0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_fake_redis():
+    from fakeredis import TcpFakeServer
+    port = free_port()
+    server = TcpFakeServer(('127.0.0.1', port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def check_flow(state, name):
+    # 1. Start + record + aggregates
+    state.start_session(1)
+    assert state.get_aggregates(1) is None
+    state.record_snapshot(1, datetime(2025, 1, 1, 9, 0, 0), 3, 'Happy')
+    state.record_snapshot(1, datetime(2025, 1, 1, 9, 0, 4), 5, 'Happy')
+    state.record_snapshot(1, datetime(2025, 1, 1, 9, 0, 8), 6, None)
+    emotions, timeline = state.get_aggregates(1)
+    assert emotions == {'Happy': 2}, emotions
+    assert timeline == [['09:00:00', 3], ['09:00:04', 5], ['09:00:08', 6]], timeline
+
+    # 2. End clears the aggregates
+    state.end_session(1)
+    assert state.get_aggregates(1) is None
+
+    # 3. Rate limit (fixed window) + its counter expires with the window
+    bucket = f"check:{time.time()}"
+    assert [state.allow_request(bucket, 2, 60) for _ in range(3)] == [True, True, False]
+
+    # 4. Cache
+    state.cache_set('chart:1', {"timestamps": ['09:00:00'], "blinks": [3]})
+    assert state.cache_get('chart:1') == {"timestamps": ['09:00:00'], "blinks": [3]}
+    state.cache_delete('chart:1')
+    assert state.cache_get('chart:1') is None
+
+    # 5. Same type rules on both sides (reading a hash as a string is WRONGTYPE)
+    # Keep this last: fakeredis' TCP server drops the connection after an error reply.
+    # The probe keys are left to expire with SESSION_TTL.
+    state.record_snapshot(2, datetime(2025, 1, 1, 9, 0, 0), 1, 'Sad')
+    try:
+        state.backend.get('session:2:emotions')
+    except Exception as e:
+        assert 'WRONGTYPE' in str(e), e
+    else:
+        raise AssertionError("expected WRONGTYPE")
+    print(f"✅ {name}: flow OK")
+
+
+def check_memory_sweep():
+    backend = MemoryStateBackend()
+    state = SharedState(backend)
+    state.allow_request('sweep', 10, 1)
+    time.sleep(1.1)
+    shared_state_module.SWEEP_INTERVAL, old_interval = 0, shared_state_module.SWEEP_INTERVAL
+    try:
+        state.cache_set('other', 1)  # Any write triggers the sweep
+    finally:
+        shared_state_module.SWEEP_INTERVAL = old_interval
+    assert not any(key.startswith('ratelimit:sweep') for key in backend._data), backend._data
+    print("✅ memory: expired keys are swept")
+
+
+def check_unavailable_store():
+    # Nothing listens on this port, every call should degrade instead of raising
+    state = SharedState(create_backend(f"redis://127.0.0.1:{free_port()}/0"))
+    state.start_session(1)
+    state.record_snapshot(1, datetime.utcnow(), 1, 'Happy')
+    assert state.get_aggregates(1) is None
+    assert state.allow_request('down', 1, 60) is True
+    assert state.cache_get('chart:1') is None
+    state.cache_set('chart:1', {})
+    state.end_session(1)
+    print("✅ redis down: degrades to no cache / no aggregates / no limit")
+
+
+if __name__ == '__main__':
+    redis_url = sys.argv[1] if len(sys.argv) > 1 else start_fake_redis()
+    check_flow(SharedState(MemoryStateBackend()), "memory")
+    check_flow(SharedState(create_backend(redis_url)), f"redis ({redis_url})")
+    check_memory_sweep()
+    check_unavailable_store()
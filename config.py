@@ -8,4 +8,10 @@ class Config:
     # Database configuration (SQLite for now)
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'database/wellbeing.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Shared state backend (memory:// for one worker, redis://host:6379/0 for many)
+    SHARED_STATE_URL = os.environ.get('SHARED_STATE_URL') or 'memory://'
+    # Max /api/update_session calls per user per minute (the monitor syncs every 4s).
+    # With memory:// each worker keeps its own count, so the real limit is workers x this value.
+    UPDATE_RATE_LIMIT = int(os.environ.get('UPDATE_RATE_LIMIT') or 60)
\ No newline at end of file
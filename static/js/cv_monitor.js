@@ -262,6 +262,9 @@ setInterval(() => {
             current_ear: currentEAR,
             session_avg_ear: sessionAvgEAR
         })
+    }).then(res => {
+        if (res.status === 429) console.warn("Sync rate limited, snapshot dropped.");
+        else if (!res.ok) console.log("Sync error:", res.status);
     }).catch(e => console.log("Sync error:", e));
 }, 4000);
 
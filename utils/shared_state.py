@@ -0,0 +1,254 @@
+import functools
+import json
+import logging
+import threading
+import time
+
+# Shared state layer for multi-worker / multi-node deployments.
+# Every gunicorn worker talks to the same store, so live session aggregates,
+# rate-limit buckets and cache entries are coherent across workers instead
+# of living in one process.
+#
+# SHARED_STATE_URL picks the backend:
+#   memory://                 -> MemoryStateBackend (single process, default)
+#   redis://localhost:6379/0  -> RedisStateBackend (any Redis-protocol server)
+#
+# The store is only an accelerator: if it is down or slow, SharedState logs
+# the error and behaves like an empty cache, so routes fall back to SQLite.
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL = 12 * 60 * 60   # Session aggregates expire after 12h idle
+CACHE_TTL = 60 * 60          # Default lifetime for cache entries
+SWEEP_INTERVAL = 60          # How often the memory backend purges expired keys
+
+
+# 1. In-Memory Backend (one process only, useful for dev & tests)
+class MemoryStateBackend:
+    errors = ()  # Nothing to recover from, a dict can't go offline
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _alive(self, key):
+        # Drop the key if its TTL has passed (called with the lock held)
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    def _sweep(self):
+        # Purge every expired key now and then, so keys nobody reads again
+        # (old rate-limit windows, abandoned sessions) don't pile up forever
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        for key in [k for k, expires_at in self._expiry.items() if expires_at <= now]:
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def _typed(self, key, kind, create=False):
+        # Mirror Redis: a key holds one type, using it as another is an error
+        if not self._alive(key):
+            if not create:
+                return None
+            self._data[key] = kind()
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise TypeError(f"WRONGTYPE Operation against a key holding the wrong kind of value: {key}")
+        return value
+
+    def get(self, key):
+        with self._lock:
+            raw = self._typed(key, str)
+            return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._sweep()
+            self._data[key] = json.dumps(value)
+            if ttl:
+                self._expiry[key] = time.time() + ttl
+            else:
+                self._expiry.pop(key, None)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expiry.pop(key, None)
+
+    def expire(self, key, ttl):
+        with self._lock:
+            if self._alive(key):
+                self._expiry[key] = time.time() + ttl
+
+    def incr(self, key, ttl):
+        # Counter that starts its TTL when created (one atomic step, like SET NX EX + INCR)
+        with self._lock:
+            self._sweep()
+            raw = self._typed(key, str)
+            if raw is None:
+                raw = '0'
+                self._expiry[key] = time.time() + ttl
+            self._data[key] = str(int(raw) + 1)
+            return int(self._data[key])
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            self._sweep()
+            fields = self._typed(key, dict, create=True)
+            fields[field] = fields.get(field, 0) + amount
+            return fields[field]
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._typed(key, dict) or {})
+
+    def rpush(self, key, value):
+        with self._lock:
+            self._sweep()
+            items = self._typed(key, list, create=True)
+            items.append(json.dumps(value))
+            return len(items)
+
+    def lrange(self, key):
+        with self._lock:
+            return [json.loads(item) for item in self._typed(key, list) or []]
+
+
+# 2. Redis Backend (works against Redis or any local stand-in speaking RESP)
+class RedisStateBackend:
+    def __init__(self, url):
+        import redis
+        self.errors = (redis.RedisError,)
+        # Short timeouts: a slow store should degrade the request, not hang it
+        self._client = redis.Redis.from_url(url, decode_responses=True,
+                                            socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, json.dumps(value), ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def expire(self, key, ttl):
+        self._client.expire(key, ttl)
+
+    def incr(self, key, ttl):
+        # SET NX EX + INCR in one transaction, so the counter can never lose its TTL
+        pipe = self._client.pipeline()
+        pipe.set(key, 0, ex=ttl, nx=True)
+        pipe.incr(key)
+        return pipe.execute()[-1]
+
+    def hincrby(self, key, field, amount=1):
+        return self._client.hincrby(key, field, amount)
+
+    def hgetall(self, key):
+        return {field: int(value) for field, value in self._client.hgetall(key).items()}
+
+    def rpush(self, key, value):
+        return self._client.rpush(key, json.dumps(value))
+
+    def lrange(self, key):
+        return [json.loads(item) for item in self._client.lrange(key, 0, -1)]
+
+
+def create_backend(url):
+    """
+    Builds the shared state backend for the given SHARED_STATE_URL.
+    """
+    if not url or url.startswith('memory://'):
+        return MemoryStateBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStateBackend(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+def _degrade(fallback):
+    # Turn backend errors into a logged warning + the "nothing cached" answer
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except self.backend.errors as e:
+                logger.warning("Shared state unavailable in %s: %s", method.__name__, e)
+                return fallback
+        return wrapper
+    return decorator
+
+
+# 3. App-Level Helpers (what the routes actually call)
+class SharedState:
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryStateBackend()
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config.get('SHARED_STATE_URL'))
+        app.extensions['shared_state'] = self
+
+    # --- Active Monitoring Sessions ---
+    @_degrade(None)
+    def start_session(self, session_id):
+        self.backend.delete(f"session:{session_id}:emotions", f"session:{session_id}:timeline")
+
+    @_degrade(None)
+    def end_session(self, session_id):
+        self.backend.delete(f"session:{session_id}:emotions", f"session:{session_id}:timeline")
+
+    # --- Running Telemetry Aggregates ---
+    @_degrade(None)
+    def record_snapshot(self, session_id, timestamp, blinks, emotion):
+        emotions_key = f"session:{session_id}:emotions"
+        timeline_key = f"session:{session_id}:timeline"
+
+        if emotion:
+            self.backend.hincrby(emotions_key, emotion)
+        self.backend.rpush(timeline_key, [timestamp.strftime('%H:%M:%S'), blinks])
+
+        # Keep the aggregates alive as long as the session is
+        self.backend.expire(emotions_key, SESSION_TTL)
+        self.backend.expire(timeline_key, SESSION_TTL)
+
+    @_degrade(None)
+    def get_aggregates(self, session_id):
+        """
+        Returns (emotion_counts, timeline), or None if the store has nothing for the
+        session or can't be reached, so callers fall back to SQLite.
+        """
+        timeline = self.backend.lrange(f"session:{session_id}:timeline")
+        if not timeline:
+            return None
+        return self.backend.hgetall(f"session:{session_id}:emotions"), timeline
+
+    # --- Rate-Limit Buckets (fixed window) ---
+    @_degrade(True)
+    def allow_request(self, bucket, limit, window_seconds):
+        window = int(time.time() // window_seconds)
+        count = self.backend.incr(f"ratelimit:{bucket}:{window}", window_seconds)
+        return count <= limit
+
+    # --- Cache Entries ---
+    @_degrade(None)
+    def cache_get(self, key):
+        return self.backend.get(f"cache:{key}")
+
+    @_degrade(None)
+    def cache_set(self, key, value, ttl=CACHE_TTL):
+        self.backend.set(f"cache:{key}", value, ttl=ttl)
+
+    @_degrade(None)
+    def cache_delete(self, key):
+        self.backend.delete(f"cache:{key}")